@@ -1,26 +1,231 @@
-from stability_ai.client_interface import ClientInterface
+import threading
+import requests
+from concurrent.futures import ProcessPoolExecutor
+from stability_ai.client_interface import ( ClientInterface, ResponseHandler )
+from stability_ai.key_pool import ( Credential, CredentialState, KeyPool, KeySelectionStrategy )
+from stability_ai.routing import ( EndpointRouter, is_connect_error, is_idempotent, rebase_url )
+from stability_ai.scheduler import ( Priority, PriorityClass, RequestScheduler, DEFAULT_PRIORITY )
+from stability_ai.util import ( make_headers, rewind_files )
 from stability_ai.v1 import V1
-from typing import ( Optional )
+from typing import ( Any, Optional, List, Dict )
+
+FAILOVER = object()
 
 class Client(ClientInterface):
     def __init__(
         self,
-        api_key: str,
+        api_key: Optional[str] = None,
         organization: Optional[str] = None,
         client_id: Optional[str] = None,
         client_version: Optional[str] = None,
+        credentials: Optional[List[Credential]] = None,
+        key_selection: KeySelectionStrategy = KeySelectionStrategy.LEAST_LOADED,
+        artifact_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        priority_classes: Optional[Dict[Priority, PriorityClass]] = None,
+        max_queued: Optional[int] = None,
+        validate_params: bool = True,
+        base_urls: Optional[List[str]] = None,
     ) -> None:
         self.api_key = api_key
         self.organization = organization
         self.client_id = client_id
         self.client_version = client_version
+        self.key_pool: Optional[KeyPool] = None
+        self.artifact_workers = artifact_workers
+        self._artifact_executor: Optional[ProcessPoolExecutor] = None
+        self._artifact_executor_lock = threading.Lock()
+        self.scheduler: Optional[RequestScheduler] = None
+        self._validate_params = validate_params
+        self.router: Optional[EndpointRouter] = EndpointRouter(base_urls=base_urls) if base_urls else None
+
+        if max_concurrency is not None:
+            self.scheduler = RequestScheduler(
+                max_concurrency=max_concurrency,
+                classes=priority_classes,
+                max_queued=max_queued
+            )
+
+        if credentials:
+            self.key_pool = KeyPool(credentials=credentials, strategy=key_selection)
+            if self.api_key is None:
+                self.api_key = credentials[0].api_key
+                self.organization = credentials[0].organization
 
     @property
     def headers(self):
-        return {
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        return make_headers(
+            api_key=self.api_key,
+            organization=self.organization,
+            client_id=self.client_id,
+            client_version=self.client_version
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        priority: Optional[Priority] = None,
+        handler: Optional[ResponseHandler] = None,
+        credential: Optional[CredentialState] = None,
+        **kwargs
+    ) -> Any:
+        if self.scheduler is None:
+            return self._route(method, url, headers=headers, handler=handler, credential=credential, **kwargs)
+
+        with self.scheduler.slot(priority or DEFAULT_PRIORITY):
+            return self._route(method, url, headers=headers, handler=handler, credential=credential, **kwargs)
+
+    def _route(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        handler: Optional[ResponseHandler] = None,
+        credential: Optional[CredentialState] = None,
+        **kwargs
+    ) -> Any:
+        if self.router is None:
+            return self._send(method, url, headers=headers, handler=handler, credential=credential, **kwargs)
+
+        # Only idempotent requests fail over on 5xx; a generation POST may already have run and cost credits.
+        idempotent = is_idempotent(method)
+        tried = set()
+        while True:
+            state = self.router.select(exclude=tried)
+            tried.add(state.base_url)
+            last_attempt = len(tried) >= len(self.router)
+            handled = False
+
+            def route_handler(response: requests.Response) -> Any:
+                nonlocal handled
+                handled = True
+                failed = response.status_code >= 500
+                # elapsed covers only the HTTP exchange, not time spent waiting for a key.
+                latency = response.elapsed.total_seconds()
+                if failed and idempotent and not last_attempt:
+                    self.router.record(state, latency=latency, failed=True)
+                    response.close()
+                    return FAILOVER
+
+                # Record once the body has been read, so a dropped stream counts as a single failure.
+                try:
+                    result = handler(response) if handler is not None else response
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    self.router.record(state, latency=latency, failed=True)
+                    raise
+                self.router.record(state, latency=latency, failed=failed)
+                return result
+
+            try:
+                result = self._send(
+                    method,
+                    rebase_url(url, state.base_url),
+                    headers=headers,
+                    handler=route_handler,
+                    credential=credential,
+                    **kwargs
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not handled:
+                    self.router.record(state, latency=None, failed=True)
+                if last_attempt or not (idempotent or is_connect_error(e)):
+                    raise
+                rewind_files(kwargs.get('files'))
+                continue
+
+            if result is not FAILOVER:
+                return result
+
+            rewind_files(kwargs.get('files'))
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        handler: Optional[ResponseHandler] = None,
+        credential: Optional[CredentialState] = None,
+        **kwargs
+    ) -> Any:
+        if credential is not None:
+            response = requests.request(
+                method,
+                url,
+                headers={
+                    **credential.headers(client_id=self.client_id, client_version=self.client_version),
+                    **(headers or {})
+                },
+                **kwargs
+            )
+            return handler(response) if handler is not None else response
+
+        # The handler runs while the key is still held, so streamed bodies count towards its load.
+        if self.key_pool is None:
+            return super().request(method, url, headers=headers, handler=handler, **kwargs)
+
+        attempts = len(self.key_pool)
+        for attempt in range(attempts):
+            state = self.key_pool.acquire()
+            status_code: Optional[int] = None
+            retry_after: Optional[str] = None
+            try:
+                response = requests.request(
+                    method,
+                    url,
+                    headers={
+                        **state.headers(client_id=self.client_id, client_version=self.client_version),
+                        **(headers or {})
+                    },
+                    **kwargs
+                )
+                status_code = response.status_code
+                retry_after = response.headers.get('Retry-After')
+
+                if status_code in (401, 429) and attempt < attempts - 1:
+                    response.close()
+                    rewind_files(kwargs.get('files'))
+                    continue
+
+                return handler(response) if handler is not None else response
+            finally:
+                self.key_pool.release(state, status_code=status_code, retry_after=retry_after)
+
+    @property
+    def validate_params(self) -> bool:
+        return self._validate_params
+
+    @property
+    def artifact_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.artifact_workers is None:
+            return None
+        with self._artifact_executor_lock:
+            if self._artifact_executor is None:
+                self._artifact_executor = ProcessPoolExecutor(max_workers=self.artifact_workers)
+            return self._artifact_executor
+
+    def close(self) -> None:
+        with self._artifact_executor_lock:
+            executor = self._artifact_executor
+            self._artifact_executor = None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def check_endpoints(self) -> None:
+        if self.router is not None:
+            self.router.health_check(headers=self.headers)
+
+    def refresh_balances(self) -> None:
+        if self.key_pool is not None:
+            self.key_pool.refresh_balances(client=self, client_id=self.client_id, client_version=self.client_version)
 
     @property
     def v1(self):
-        return V1(client=self)
\ No newline at end of file
+        return V1(client=self)
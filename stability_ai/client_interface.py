@@ -1,4 +1,10 @@
+import requests
+from concurrent.futures import Executor
 from abc import ABC, abstractmethod
+from typing import ( Any, Callable, Optional )
+from stability_ai.scheduler import Priority
+
+ResponseHandler = Callable[[requests.Response], Any]
 
 class ClientInterface(ABC):
     
@@ -6,4 +12,27 @@ class ClientInterface(ABC):
     @abstractmethod
     def headers(self):
         """Return the headers for the client"""
-        pass
\ No newline at end of file
+        pass
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        priority: Optional[Priority] = None,
+        handler: Optional[ResponseHandler] = None,
+        **kwargs
+    ) -> Any:
+        """Send an authenticated request to the API, passing the response to handler if given"""
+        response = requests.request(method, url, headers={**self.headers, **(headers or {})}, **kwargs)
+        return handler(response) if handler is not None else response
+
+    @property
+    def artifact_executor(self) -> Optional[Executor]:
+        """Return the executor used to decode and convert artifacts, if any"""
+        return None
+
+    @property
+    def validate_params(self) -> bool:
+        """Return whether request parameters are validated before sending"""
+        return True
@@ -0,0 +1,197 @@
+import random
+import threading
+import time
+from collections import deque
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import (
+    Any,
+    Deque,
+    List,
+    Optional
+)
+
+from stability_ai.util import make_headers
+from stability_ai.error import StabilityAIError
+from stability_ai.client_interface import ClientInterface
+from stability_ai.v1.user import User
+
+DEFAULT_RATE_LIMIT = 150
+DEFAULT_RATE_LIMIT_WINDOW = 10.0
+DEFAULT_UNAUTHORIZED_EJECTION = 300.0
+DEFAULT_RATE_LIMITED_EJECTION = 10.0
+DEFAULT_ACQUIRE_TIMEOUT = 60.0
+
+class Credential(BaseModel):
+    api_key: str
+    organization: Optional[str] = None
+    weight: float = Field(default=1.0, gt=0)
+    rate_limit: int = Field(default=DEFAULT_RATE_LIMIT, gt=0)
+
+class KeySelectionStrategy(Enum):
+    LEAST_LOADED = "least-loaded"
+    WEIGHTED = "weighted"
+
+class CredentialState:
+    credential: Credential
+    in_flight: int
+    request_times: Deque[float]
+    credits: Optional[float]
+    ejected_until: float
+
+    def __init__(self, credential: Credential) -> None:
+        self.credential = credential
+        self.in_flight = 0
+        self.request_times = deque()
+        self.credits = None
+        self.ejected_until = 0.0
+
+    def headers(
+        self,
+        client_id: Optional[str] = None,
+        client_version: Optional[str] = None
+    ) -> dict:
+        return make_headers(
+            api_key=self.credential.api_key,
+            organization=self.credential.organization,
+            client_id=client_id,
+            client_version=client_version
+        )
+
+    def load(self) -> float:
+        rate_limit_load = len(self.request_times) / self.credential.rate_limit
+        return max(self.in_flight / self.credential.weight, rate_limit_load)
+
+class CredentialClient(ClientInterface):
+    def __init__(
+        self,
+        client: ClientInterface,
+        state: CredentialState,
+        client_id: Optional[str] = None,
+        client_version: Optional[str] = None
+    ) -> None:
+        self.client = client
+        self.state = state
+        self.client_id = client_id
+        self.client_version = client_version
+
+    @property
+    def headers(self):
+        return self.state.headers(client_id=self.client_id, client_version=self.client_version)
+
+    def request(self, method: str, url: str, **kwargs) -> Any:
+        # Send through the owning client so its routing applies, pinned to this credential.
+        return self.client.request(method, url, credential=self.state, **kwargs)
+
+class KeyPool:
+    def __init__(
+        self,
+        credentials: List[Credential],
+        strategy: KeySelectionStrategy = KeySelectionStrategy.LEAST_LOADED,
+        rate_limit_window: float = DEFAULT_RATE_LIMIT_WINDOW,
+        unauthorized_ejection: float = DEFAULT_UNAUTHORIZED_EJECTION,
+        rate_limited_ejection: float = DEFAULT_RATE_LIMITED_EJECTION,
+        min_credits: float = 0.0,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT
+    ) -> None:
+        if len(credentials) == 0:
+            raise ValueError("KeyPool requires at least one credential")
+
+        self.states = [CredentialState(credential) for credential in credentials]
+        self.strategy = strategy
+        self.rate_limit_window = rate_limit_window
+        self.unauthorized_ejection = unauthorized_ejection
+        self.rate_limited_ejection = rate_limited_ejection
+        self.min_credits = min_credits
+        self.acquire_timeout = acquire_timeout
+        self.condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def _expire_request_times(self, state: CredentialState, now: float) -> None:
+        while state.request_times and now - state.request_times[0] >= self.rate_limit_window:
+            state.request_times.popleft()
+
+    def _next_available_at(self, state: CredentialState, now: float) -> Optional[float]:
+        if state.credits is not None and state.credits <= self.min_credits:
+            return None
+        if state.ejected_until > now:
+            return state.ejected_until
+        if len(state.request_times) >= state.credential.rate_limit:
+            return state.request_times[0] + self.rate_limit_window
+        return now
+
+    def _select(self, available: List[CredentialState]) -> CredentialState:
+        if self.strategy == KeySelectionStrategy.WEIGHTED:
+            return random.choices(available, weights=[state.credential.weight for state in available])[0]
+        return min(available, key=lambda state: state.load())
+
+    def acquire(self) -> CredentialState:
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                available: List[CredentialState] = []
+                next_available_at: Optional[float] = None
+
+                for state in self.states:
+                    self._expire_request_times(state, now)
+                    available_at = self._next_available_at(state, now)
+                    if available_at is None:
+                        continue
+                    if available_at <= now:
+                        available.append(state)
+                    elif next_available_at is None or available_at < next_available_at:
+                        next_available_at = available_at
+
+                if len(available) > 0:
+                    state = self._select(available)
+                    state.in_flight += 1
+                    state.request_times.append(now)
+                    return state
+
+                if next_available_at is None or next_available_at > deadline:
+                    raise StabilityAIError(429, 'No API key available in the key pool')
+
+                self.condition.wait(timeout=next_available_at - now)
+
+    def release(
+        self,
+        state: CredentialState,
+        status_code: Optional[int] = None,
+        retry_after: Optional[str] = None
+    ) -> None:
+        with self.condition:
+            state.in_flight -= 1
+            now = time.monotonic()
+
+            if status_code == 401:
+                state.ejected_until = now + self.unauthorized_ejection
+            elif status_code == 402:
+                state.credits = 0.0
+            elif status_code == 429:
+                ejection = self.rate_limited_ejection
+                if retry_after is not None and retry_after.isdigit():
+                    ejection = float(retry_after)
+                state.ejected_until = now + ejection
+
+            self.condition.notify_all()
+
+    def refresh_balances(
+        self,
+        client: ClientInterface,
+        client_id: Optional[str] = None,
+        client_version: Optional[str] = None
+    ) -> None:
+        for state in self.states:
+            credential_client = CredentialClient(client, state, client_id=client_id, client_version=client_version)
+            try:
+                credits = User(client=credential_client).balance().credits
+            except StabilityAIError:
+                continue
+
+            with self.condition:
+                state.credits = credits
+                self.condition.notify_all()
@@ -0,0 +1,135 @@
+import threading
+import time
+import requests
+from urllib3.exceptions import NewConnectionError
+from typing import (
+    List,
+    Optional,
+    Set
+)
+
+from stability_ai.util import STABILITY_AI_BASE_URL
+
+DEFAULT_LATENCY_ALPHA = 0.2
+DEFAULT_ERROR_PENALTY = 10.0
+DEFAULT_EJECTION_FAILURES = 3
+DEFAULT_EJECTION_DURATION = 30.0
+DEFAULT_ERROR_HALF_LIFE = 30.0
+DEFAULT_HEALTH_CHECK_PATH = "/v1/engines/list"
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5.0
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+class BaseURLState:
+    base_url: str
+    latency: Optional[float]
+    error_rate: float
+    error_updated_at: float
+    consecutive_failures: int
+    ejected_until: float
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.latency = None
+        self.error_rate = 0.0
+        self.error_updated_at = time.monotonic()
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def decayed_error_rate(self, now: float, half_life: float) -> float:
+        # Errors fade with wall-clock time, so an endpoint that stops getting traffic is eventually retried.
+        return self.error_rate * 0.5 ** (max(0.0, now - self.error_updated_at) / half_life)
+
+    def score(self, error_penalty: float, now: float, half_life: float) -> float:
+        # Endpoints without a latency sample or errors score best so they get probed.
+        return (self.latency or 0.0) + error_penalty * self.decayed_error_rate(now, half_life)
+
+class EndpointRouter:
+    def __init__(
+        self,
+        base_urls: List[str],
+        latency_alpha: float = DEFAULT_LATENCY_ALPHA,
+        error_penalty: float = DEFAULT_ERROR_PENALTY,
+        ejection_failures: int = DEFAULT_EJECTION_FAILURES,
+        ejection_duration: float = DEFAULT_EJECTION_DURATION,
+        error_half_life: float = DEFAULT_ERROR_HALF_LIFE
+    ) -> None:
+        if len(base_urls) == 0:
+            raise ValueError("EndpointRouter requires at least one base URL")
+
+        self.states = [BaseURLState(base_url) for base_url in base_urls]
+        self.latency_alpha = latency_alpha
+        self.error_penalty = error_penalty
+        self.ejection_failures = ejection_failures
+        self.ejection_duration = ejection_duration
+        self.error_half_life = error_half_life
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def select(self, exclude: Optional[Set[str]] = None) -> BaseURLState:
+        exclude = exclude or set()
+
+        with self.lock:
+            now = time.monotonic()
+            candidates = [state for state in self.states if state.base_url not in exclude]
+            if len(candidates) == 0:
+                candidates = self.states
+
+            healthy = [state for state in candidates if state.ejected_until <= now]
+            if len(healthy) == 0:
+                # Every endpoint is ejected: fail open to the one that recovers first.
+                return min(candidates, key=lambda state: state.ejected_until)
+
+            return min(healthy, key=lambda state: state.score(self.error_penalty, now, self.error_half_life))
+
+    def record(self, state: BaseURLState, latency: Optional[float], failed: bool) -> None:
+        with self.lock:
+            now = time.monotonic()
+            alpha = self.latency_alpha
+            error_rate = state.decayed_error_rate(now, self.error_half_life)
+            state.error_rate = (1 - alpha) * error_rate + alpha * (1.0 if failed else 0.0)
+            state.error_updated_at = now
+
+            if latency is not None:
+                state.latency = latency if state.latency is None else (1 - alpha) * state.latency + alpha * latency
+
+            if failed:
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= self.ejection_failures:
+                    state.ejected_until = now + self.ejection_duration
+            else:
+                state.consecutive_failures = 0
+                state.ejected_until = 0.0
+
+    def health_check(
+        self,
+        headers: dict,
+        path: str = DEFAULT_HEALTH_CHECK_PATH,
+        timeout: float = DEFAULT_HEALTH_CHECK_TIMEOUT
+    ) -> None:
+        for state in self.states:
+            latency: Optional[float] = None
+            try:
+                response = requests.get(f"{state.base_url}{path}", headers=headers, timeout=timeout)
+                failed = response.status_code >= 500
+                latency = response.elapsed.total_seconds()
+            except requests.exceptions.RequestException:
+                failed = True
+            self.record(state, latency=latency, failed=failed)
+
+def is_idempotent(method: str) -> bool:
+    return method.upper() in IDEMPOTENT_METHODS
+
+def is_connect_error(error: Exception) -> bool:
+    # True only when the request never reached the server, so resending cannot duplicate work.
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and len(error.args) > 0:
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+def rebase_url(url: str, base_url: str) -> str:
+    if url.startswith(STABILITY_AI_BASE_URL):
+        return f"{base_url.rstrip('/')}{url[len(STABILITY_AI_BASE_URL):]}"
+    return url
@@ -0,0 +1,160 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from pydantic import BaseModel
+from typing import (
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional
+)
+
+from stability_ai.error import StabilityAIError
+
+class Priority(Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+DEFAULT_PRIORITY = Priority.INTERACTIVE
+
+class PriorityClass(BaseModel):
+    weight: float = 1.0
+    reserved: int = 0
+    preemptible: bool = False
+
+def get_default_priority_classes(max_concurrency: int) -> Dict[Priority, PriorityClass]:
+    # Reserve one interactive slot only when a shared slot is left for batch work.
+    return {
+        Priority.INTERACTIVE: PriorityClass(weight=4.0, reserved=min(1, max_concurrency - 1)),
+        Priority.BATCH: PriorityClass(weight=1.0, preemptible=True),
+    }
+
+class Ticket:
+    priority: Priority
+    tag: float
+    dispatched: bool
+    preempted: bool
+
+    def __init__(self, priority: Priority, tag: float) -> None:
+        self.priority = priority
+        self.tag = tag
+        self.dispatched = False
+        self.preempted = False
+
+class RequestScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        classes: Optional[Dict[Priority, PriorityClass]] = None,
+        max_queued: Optional[int] = None
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.classes = classes or get_default_priority_classes(max_concurrency)
+        missing = [priority.value for priority in Priority if priority not in self.classes]
+        if len(missing) > 0:
+            raise ValueError(f"Priority classes must cover every priority, missing: {', '.join(missing)}")
+        reserved = sum(priority_class.reserved for priority_class in self.classes.values())
+        shared_required = any(priority_class.reserved == 0 for priority_class in self.classes.values())
+        if reserved > max_concurrency or (shared_required and reserved == max_concurrency):
+            raise ValueError("Reserved concurrency must leave at least one shared slot below max_concurrency")
+
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.queues: Dict[Priority, Deque[Ticket]] = {priority: deque() for priority in self.classes}
+        self.in_flight: Dict[Priority, int] = {priority: 0 for priority in self.classes}
+        self.last_tags: Dict[Priority, float] = {priority: 0.0 for priority in self.classes}
+        self.virtual_time = 0.0
+        self.condition = threading.Condition()
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _unmet_reservations(self, excluding: Priority) -> int:
+        return sum(
+            max(0, priority_class.reserved - self.in_flight[priority])
+            for priority, priority_class in self.classes.items()
+            if priority != excluding
+        )
+
+    def _eligible(self, priority: Priority) -> bool:
+        if self.in_flight[priority] < self.classes[priority].reserved:
+            return True
+        free = self.max_concurrency - sum(self.in_flight.values())
+        return free - self._unmet_reservations(excluding=priority) > 0
+
+    def _dispatch(self) -> None:
+        while sum(self.in_flight.values()) < self.max_concurrency:
+            candidates: List[Ticket] = [
+                queue[0] for priority, queue in self.queues.items()
+                if queue and self._eligible(priority)
+            ]
+            if len(candidates) == 0:
+                return
+
+            ticket = min(candidates, key=lambda candidate: candidate.tag)
+            self.queues[ticket.priority].popleft()
+            self.in_flight[ticket.priority] += 1
+            self.virtual_time = ticket.tag
+            ticket.dispatched = True
+            self.condition.notify_all()
+
+    def _preempt_one(self, priority: Priority) -> bool:
+        for victim_priority, priority_class in self.classes.items():
+            if victim_priority == priority or not priority_class.preemptible:
+                continue
+            queue = self.queues[victim_priority]
+            if queue:
+                ticket = queue.pop()
+                ticket.preempted = True
+                self.condition.notify_all()
+                return True
+        return False
+
+    def preempt_queued(self, priority: Priority) -> int:
+        with self.condition:
+            queue = self.queues[priority]
+            count = len(queue)
+            for ticket in queue:
+                ticket.preempted = True
+            queue.clear()
+            self.condition.notify_all()
+            return count
+
+    def acquire(self, priority: Priority = DEFAULT_PRIORITY) -> Ticket:
+        with self.condition:
+            tag = max(self.virtual_time, self.last_tags[priority]) + 1.0 / self.classes[priority].weight
+            ticket = Ticket(priority=priority, tag=tag)
+            self.queues[priority].append(ticket)
+            self._dispatch()
+
+            if not ticket.dispatched and self.max_queued is not None and self.queued() > self.max_queued:
+                if self.classes[priority].preemptible or not self._preempt_one(priority):
+                    self.queues[priority].remove(ticket)
+                    raise StabilityAIError(429, 'Request scheduler queue is full')
+
+            # Only admitted tickets count against the class's fair-queuing share.
+            self.last_tags[priority] = tag
+
+            while not ticket.dispatched and not ticket.preempted:
+                self.condition.wait()
+
+            if ticket.preempted:
+                raise StabilityAIError(429, f"Queued {priority.value} request preempted by the scheduler")
+
+            return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        with self.condition:
+            self.in_flight[ticket.priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: Priority = DEFAULT_PRIORITY) -> Iterator[Ticket]:
+        ticket = self.acquire(priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
@@ -3,14 +3,22 @@ import os
 import tempfile
 import requests
 import base64
+import hashlib
+import io
 from pathlib import Path
 from enum import Enum
 from pydantic import BaseModel
-from typing import (Optional, Union, Set)
+from typing import (Optional, Union, Set, Iterable, Callable, BinaryIO, Tuple)
 from urllib.parse import urlparse
 
 STABILITY_AI_BASE_URL = "https://api.stability.ai"
 
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_RESUME_ATTEMPTS = 3
+DEFAULT_DOWNLOAD_TIMEOUT = (10.0, 60.0)
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
 class APIVersion(Enum):
     V1 = "v1"
     V2_BETA = "v2beta"
@@ -30,13 +38,17 @@ class ContentType(Enum):
 DEFAULT_OUTPUT_FORMAT = OutputFormat.PNG
 
 class StabilityAIContentResponse(BaseModel):
-    filepath: str
+    filepath: Optional[str]
     filename: str
     content_type: ContentType
     output_format: OutputFormat
     content_filtered: bool
     errored: bool
     seed: int
+    sha256: Optional[str] = None
+    content: Optional[bytes] = None
+
+ImageInput = Union[str, bytes, StabilityAIContentResponse]
 
 class StabilityAIStatus(Enum):
     IN_PROGRESS = "in-progress"
@@ -52,6 +64,30 @@ def make_url(
 ) -> str:
     return f"{STABILITY_AI_BASE_URL}/{version.value}/{resource}{f'/{endpoint}' if endpoint.__len__() > 0  else ''}"
 
+def make_headers(
+    api_key: str,
+    organization: Optional[str] = None,
+    client_id: Optional[str] = None,
+    client_version: Optional[str] = None
+) -> dict:
+    headers = {
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    if organization is not None:
+        headers["Organization"] = organization
+    if client_id is not None:
+        headers["Stability-Client-ID"] = client_id
+    if client_version is not None:
+        headers["Stability-Client-Version"] = client_version
+
+    return headers
+
+def rewind_files(files: Optional[dict]) -> None:
+    for file in (files or {}).values():
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
 def is_valid_http_url(resource: str) -> bool: 
     try:
         result = urlparse(resource)
@@ -68,21 +104,27 @@ def is_valid_file(resource: str) -> bool:
 class ImagePathType(Enum):
     DOWNLOAD = "download"
     LOCAL = "local"
+    BUFFER = "buffer"
 
 class ImagePath:
-    resource: str
+    resource: Union[str, bytes]
     type: ImagePathType
     download_filepath: Optional[str]
 
-    def __init__(self, resource:str) -> None:
+    def __init__(self, resource: ImageInput) -> None:
+        if isinstance(resource, StabilityAIContentResponse):
+            resource = resource.content if resource.content is not None else resource.filepath
+
         self.resource = resource
         self.download_filepath = None
-        if is_valid_http_url(resource=resource):
+        if isinstance(resource, (bytes, bytearray)):
+            self.type = ImagePathType.BUFFER
+        elif is_valid_http_url(resource=resource):
             self.type = ImagePathType.DOWNLOAD
         elif is_valid_file(resource=resource):
             self.type = ImagePathType.LOCAL
         else:
-            raise Exception("Invalid image resource. Must be a local filepath or public URL.")
+            raise Exception("Invalid image resource. Must be a local filepath, public URL, bytes or content response.")
         
     def filepath(self) -> str:
         match self.type:
@@ -94,6 +136,15 @@ class ImagePath:
                 else:
                     self.download_filepath = download_image(url=self.resource)
                     return self.download_filepath
+            case ImagePathType.BUFFER:
+                raise Exception("In-memory image resources have no filepath. Use open() instead.")
+
+    def open(self) -> BinaryIO:
+        match self.type:
+            case ImagePathType.BUFFER:
+                return io.BytesIO(self.resource)
+            case _:
+                return open(self.filepath(), "rb")
         
     def cleanup(self) -> None:
         match self.type:
@@ -120,20 +171,91 @@ def delete_file(filepath: str):
     except Exception as e:
         print(f"An error occurred while deleting the file {filepath}: {str(e)}")
 
-def download_image(url: str):
+def get_content_length(response: requests.Response) -> Optional[int]:
+    content_range = response.headers.get('Content-Range')
+    if content_range is not None and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+
+    content_length = response.headers.get('Content-Length')
+    return int(content_length) if content_length is not None and content_length.isdigit() else None
+
+def write_chunks(
+    chunks: Iterable[bytes],
+    file: BinaryIO,
+    on_progress: Optional[ProgressCallback] = None,
+    total: Optional[int] = None,
+    written: int = 0
+) -> int:
+    for chunk in chunks:
+        if not chunk:
+            continue
+        file.write(chunk)
+        written += len(chunk)
+        if on_progress is not None:
+            on_progress(written, total)
+
+    return written
+
+def stream_download(
+    url: str,
+    filepath: str,
+    headers: Optional[dict] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+    max_resume_attempts: int = DEFAULT_MAX_RESUME_ATTEMPTS,
+    timeout: Tuple[float, float] = DEFAULT_DOWNLOAD_TIMEOUT
+) -> str:
+    # An existing file at filepath is treated as a partial download and resumed.
+    written = os.path.getsize(filepath) if os.path.isfile(filepath) else 0
+    attempts = 0
+
+    while True:
+        request_headers = {**(headers or {})}
+        if written > 0:
+            request_headers['Range'] = f"bytes={written}-"
+
+        total = None
+        try:
+            with requests.get(url, headers=request_headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and written > 0:
+                    return filepath
+
+                if response.status_code == 206:
+                    mode = 'ab'
+                elif response.status_code == 200:
+                    mode = 'wb'
+                    written = 0
+                else:
+                    raise Exception(f"Failed to download file. Url: {url}, Status code: {response.status_code}")
+
+                total = get_content_length(response)
+                with open(filepath, mode) as file:
+                    written = write_chunks(
+                        chunks=response.iter_content(chunk_size=chunk_size),
+                        file=file,
+                        on_progress=on_progress,
+                        total=total,
+                        written=written
+                    )
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if os.path.isfile(filepath):
+                written = os.path.getsize(filepath)
+        else:
+            if total is None or written >= total:
+                return filepath
+
+        attempts += 1
+        if attempts > max_resume_attempts:
+            raise Exception(f"Failed to download file. Url: {url}, gave up after {max_resume_attempts} resume attempts")
+
+def download_image(url: str, on_progress: Optional[ProgressCallback] = None):
     filename = f"{uuid.uuid4()}.{get_file_extension(url)}"
 
     temp_dir = get_persistent_temp_dir()
     filepath = os.path.join(temp_dir, filename)
 
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(filepath, 'wb') as file:
-            file.write(response.content)
-
-        return filepath
-    else:
-        raise Exception(f"Failed to download image. Url: {url}, Status code: {response.status_code}")
+    return stream_download(url=url, filepath=filepath, on_progress=on_progress)
         
 class FinishReason(Enum):
     SUCCESS = "SUCCESS"
@@ -159,7 +281,26 @@ def get_persistent_temp_dir():
     
     return temp_dir
         
-def process_content_response(data: dict, output_format: OutputFormat, resource: str):
+def convert_image(data: bytes, output_format: OutputFormat) -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        raise Exception(f"Pillow is required to convert images to {output_format.value}. Install it with `pip install pillow`.")
+
+    with Image.open(io.BytesIO(data)) as image:
+        if output_format == OutputFormat.JPEG and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format=output_format.value.upper())
+        return buffer.getvalue()
+
+def process_content_response(
+    data: dict,
+    output_format: OutputFormat,
+    resource: str,
+    source_format: Optional[OutputFormat] = None,
+    in_memory: bool = False
+):
     file_data = data.get('video') if output_format == OutputFormat.MP4 else data.get('image')
     if file_data is None:
         file_data = data.get('base64')
@@ -170,10 +311,16 @@ def process_content_response(data: dict, output_format: OutputFormat, resource:
         
     filename = f"{resource}_{uuid.uuid4()}.{output_format.value}"
 
-    temp_dir = get_persistent_temp_dir()
-    filepath = os.path.join(temp_dir, filename)
-    with open(filepath, 'wb') as file:
-        file.write(base64.b64decode(file_data))
+    content = base64.b64decode(file_data)
+    if source_format is not None and source_format != output_format:
+        content = convert_image(data=content, output_format=output_format)
+
+    filepath: Optional[str] = None
+    if not in_memory:
+        temp_dir = get_persistent_temp_dir()
+        filepath = os.path.join(temp_dir, filename)
+        with open(filepath, 'wb') as file:
+            file.write(content)
 
     return StabilityAIContentResponse(
         filepath=filepath,
@@ -182,23 +329,76 @@ def process_content_response(data: dict, output_format: OutputFormat, resource:
         output_format=output_format,
         content_filtered=True if finish_reason == FinishReason.CONTENT_FILTERED else False,
         errored=True if finish_reason == FinishReason.ERROR else False,
-        seed=data.get("seed", 0)
+        seed=data.get("seed", 0),
+        sha256=hashlib.sha256(content).hexdigest(),
+        content=content if in_memory else None
     )
         
-def process_array_buffer_response(data: Union[str, bytes], output_format: OutputFormat, resource: str):
-    filename = f"{resource}_{uuid.uuid4()}.{output_format}"
+def process_array_buffer_response(
+    data: Union[str, bytes, Iterable[bytes]],
+    output_format: OutputFormat,
+    resource: str,
+    on_progress: Optional[ProgressCallback] = None,
+    total: Optional[int] = None,
+    in_memory: bool = False,
+    finish_reason: FinishReason = FinishReason.SUCCESS,
+    seed: int = 0,
+    file: Optional[BinaryIO] = None
+):
+    filename = f"{resource}_{uuid.uuid4()}.{output_format.value}"
 
-    temp_dir = get_persistent_temp_dir()
-    filepath = os.path.join(temp_dir, filename)
-    with open(filepath, 'wb') as file:
-        file.write(data)
+    if isinstance(data, str):
+        data = data.encode()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = [data]
+
+    filepath: Optional[str] = None
+    content: Optional[bytes] = None
+    if file is not None:
+        write_chunks(chunks=data, file=file, on_progress=on_progress, total=total)
+        name = getattr(file, 'name', None)
+        filepath = name if isinstance(name, str) else None
+    elif in_memory:
+        buffer = io.BytesIO()
+        write_chunks(chunks=data, file=buffer, on_progress=on_progress, total=total)
+        content = buffer.getvalue()
+    else:
+        temp_dir = get_persistent_temp_dir()
+        filepath = os.path.join(temp_dir, filename)
+        with open(filepath, 'wb') as file:
+            write_chunks(chunks=data, file=file, on_progress=on_progress, total=total)
 
     return StabilityAIContentResponse(
         filepath=filepath,
         filename=filename,
         content_type=get_content_type(output_format=output_format),
         output_format=output_format,
-        content_filtered=False,
-        errored=False,
-        seed=0
-    )
\ No newline at end of file
+        content_filtered=True if finish_reason == FinishReason.CONTENT_FILTERED else False,
+        errored=True if finish_reason == FinishReason.ERROR else False,
+        seed=seed,
+        content=content
+    )
+
+def process_stream_response(
+    response: requests.Response,
+    output_format: OutputFormat,
+    resource: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+    in_memory: bool = False,
+    file: Optional[BinaryIO] = None
+):
+    try:
+        return process_array_buffer_response(
+            data=response.iter_content(chunk_size=chunk_size),
+            output_format=output_format,
+            resource=resource,
+            on_progress=on_progress,
+            total=get_content_length(response),
+            in_memory=in_memory,
+            finish_reason=FinishReason(response.headers.get('Finish-Reason', FinishReason.SUCCESS)),
+            seed=int(response.headers.get('Seed', 0)),
+            file=file
+        )
+    finally:
+        response.close()
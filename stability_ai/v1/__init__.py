@@ -2,6 +2,7 @@ from stability_ai.client_interface import ClientInterface
 from stability_ai.v1.engines import Engines
 from stability_ai.v1.user import User
 from stability_ai.v1.generation import Generation
+from stability_ai.v1.pipeline import Pipeline
 
 class V1:
     def __init__(
@@ -20,4 +21,8 @@ class V1:
 
     @property
     def generation(self):
-        return Generation(client=self.client)
\ No newline at end of file
+        return Generation(client=self.client)
+
+    @property
+    def pipeline(self):
+        return Pipeline(client=self.client)
\ No newline at end of file
@@ -1,4 +1,3 @@
-import requests
 from enum import Enum
 from pydantic import BaseModel
 from typing import (
@@ -43,7 +42,7 @@ class Engines():
   
     def list(self) -> ListResponse:
         url = make_url(APIVersion.V1, resource=resource, endpoint=Endpoint.LIST)
-        response = requests.get(url, headers=self.client.headers)
+        response = self.client.request('GET', url)
 
         if response.status_code == 200:
             try:
@@ -1,17 +1,22 @@
-import requests
-from enum import Enum
+from requests import Response
+from concurrent.futures import Executor
 from typing import (
+    Any,
     List,
     Optional,
-    TypedDict
+    Tuple,
+    TypedDict,
+    Union
 )
 from typing_extensions import Unpack
 from stability_ai.util import (
     make_url,
     process_content_response,
+    process_stream_response,
     APIVersion,
     OutputFormat,
     ImagePath,
+    ImageInput,
     filter_params,
     StabilityAIContentResponse
 )
@@ -19,62 +24,21 @@ from stability_ai.error import (
     StabilityAIError
 )
 from stability_ai.client_interface import ClientInterface
+from stability_ai.scheduler import Priority
+from stability_ai.v1.generation_enums import (
+    Endpoint,
+    EngineId,
+    ClipGuidancePreset,
+    Sampler,
+    StylePreset,
+    ImageToImageMode,
+    ImageToImageMaskSource
+)
+from stability_ai.v1.validation import raise_for_issues
 
 resource = 'generation'
 
-class Endpoint(str, Enum):
-    TEXT_TO_IMAGE = "text-to-image",
-    IMAGE_TO_IMAGE = "image-to-image",
-    IMAGE_TO_IMAGE_UPSCALE = "image-to-image/upscale",
-    IMAGE_TO_IMAGE_MASKING = "image-to-image/masking",
-
-class EngineId(str, Enum):
-    ESRGAN_V1_X2PLUS = "esrgan-v1-x2plus"
-    STABLE_DIFFUSION_XL_1024_V0_9 = "stable-diffusion-xl-1024-v0-9"
-    STABLE_DIFFUSION_XL_1024_V1_0 = "stable-diffusion-xl-1024-v1-0"
-    STABLE_DIFFUSION_V1_6 = "stable-diffusion-v1-6"
-    STABLE_DIFFUSION_512_V2_1 = "stable-diffusion-512-v2-1"
-    STABLE_DIFFUSION_XL_BETA_V2_2_2 = "stable-diffusion-xl-beta-v2-2-2"
-
-class ClipGuidancePreset(str, Enum):
-    FAST_BLUE = "FAST_BLUE"
-    FAST_GREEN = "FAST_GREEN"
-    NONE = "NONE"
-    SIMPLE = "SIMPLE"
-    SLOW = "SLOW"
-    SLOWER = "SLOWER"
-    SLOWEST = "SLOWEST"
-
-class Sampler(str, Enum):
-    DDIM = "DDIM"
-    DDPM = "DDPM"
-    K_DPMPP_2M = "K_DPMPP_2M"
-    K_DPMPP_2S_ANCESTRAL = "K_DPMPP_2S_ANCESTRAL"
-    K_DPM_2 = "K_DPM_2"
-    K_DPM_2_ANCESTRAL = "K_DPM_2_ANCESTRAL"
-    K_EULER = "K_EULER"
-    K_EULER_ANCESTRAL = "K_EULER_ANCESTRAL"
-    K_HEUN = "K_HEUN"
-    K_LMS = "K_LMS"
-
-class StylePreset(str, Enum):
-    MODEL_3D = "3d-model"
-    ANALOG_FILM = "analog-film"
-    ANIME = "anime"
-    CINEMATIC = "cinematic"
-    COMIC_BOOK = "comic-book"
-    DIGITAL_ART = "digital-art"
-    ENHANCE = "enhance"
-    FANTASY_ART = "fantasy-art"
-    ISOMETRIC = "isometric"
-    LINE_ART = "line-art"
-    LOW_POLY = "low-poly"
-    MODELING_COMPOUND = "modeling-compound"
-    NEON_PUNK = "neon-punk"
-    ORIGAMI = "origami"
-    PHOTOGRAPHIC = "photographic"
-    PIXEL_ART = "pixel-art"
-    TILE_TEXTURE = "tile-texture"
+client_params = {'output_format', 'priority', 'in_memory', 'raw_binary'}
 
 class TextPrompt(TypedDict):
     text: str
@@ -93,15 +57,15 @@ class V1GenerationOptionalParams(TypedDict):
     steps: Optional[int]
     style_preset: Optional[StylePreset]
     extra: Optional[dict]
+    output_format: Optional[OutputFormat]
+    priority: Optional[Priority]
+    in_memory: Optional[bool]
+    raw_binary: Optional[bool]
 
 class TextToImageOptions(V1GenerationRequiredParams, V1GenerationOptionalParams):
     height: Optional[int]
     width: Optional[int]
 
-class ImageToImageMode(str, Enum):
-    IMAGE_STRENGTH = 'IMAGE_STRENGTH'
-    STEP_SCHEDULE = 'STEP_SCHEDULE'
-
 class ImageToImageStrengthOptions(TypedDict):
     mode: ImageToImageMode = ImageToImageMode.IMAGE_STRENGTH
     image_strength: float
@@ -112,22 +76,21 @@ class ImageToImageStepScheduleOptions(TypedDict):
     step_schedule_end: float
 
 class ImageToImageOptions(V1GenerationRequiredParams, V1GenerationOptionalParams, ImageToImageStrengthOptions, ImageToImageStepScheduleOptions):
-    init_image: str
+    init_image: ImageInput
 
 class ImageToImageUpscaleOptions(TypedDict):
-    image: str
+    image: ImageInput
     height: Optional[int]
     width: Optional[int]
-
-class ImageToImageMaskSource(str, Enum):
-    MASK_IMAGE_WHITE = 'MASK_IMAGE_WHITE'
-    MASK_IMAGE_BLACK = 'MASK_IMAGE_BLACK'
-    INIT_IMAGE_ALPHA = 'INIT_IMAGE_ALPHA'
+    output_format: Optional[OutputFormat]
+    priority: Optional[Priority]
+    in_memory: Optional[bool]
+    raw_binary: Optional[bool]
 
 class ImageToImageMaskingOptions(V1GenerationRequiredParams, V1GenerationOptionalParams):
-    init_image: str
+    init_image: ImageInput
     mask_source: Optional[ImageToImageMaskSource]
-    mask_image: Optional[str]
+    mask_image: Optional[ImageInput]
 
 def get_multi_part_text_prompts(text_prompts: List[TextPrompt]):
     multi_part_text_prompts = {}
@@ -138,68 +101,126 @@ def get_multi_part_text_prompts(text_prompts: List[TextPrompt]):
 
     return multi_part_text_prompts
 
-def process_articafts(artifacts: List[dict], endpoint: Endpoint) -> List[StabilityAIContentResponse]:
-    results: List[StabilityAIContentResponse] = []
+def get_resource_name(endpoint: Endpoint) -> str:
+    return f"v1_generation_{endpoint.replace('/', '_').replace('-', '_')}"
 
-    for artifact in artifacts:
-        results.append(
-            process_content_response(
-                data=artifact,
-                output_format=OutputFormat.PNG,
-                resource=f"v1_generation_{endpoint.replace('/', '_').replace('-', '_')}"
-            )
-        )
-    
-    return results
+def get_accept_header(params: dict) -> str:
+    return 'image/png' if params.get('raw_binary') else 'application/json'
+
+def process_articafts(
+    artifacts: List[dict],
+    endpoint: Endpoint,
+    output_format: Optional[OutputFormat] = None,
+    executor: Optional[Executor] = None,
+    in_memory: bool = False
+) -> List[StabilityAIContentResponse]:
+    params = {
+        'output_format': output_format or OutputFormat.PNG,
+        'resource': get_resource_name(endpoint),
+        'source_format': OutputFormat.PNG,
+        'in_memory': in_memory
+    }
+
+    if executor is None:
+        return [process_content_response(data=artifact, **params) for artifact in artifacts]
+
+    futures = [executor.submit(process_content_response, data=artifact, **params) for artifact in artifacts]
+    return [future.result() for future in futures]
 
 class Generation():
     def __init__(self, client: ClientInterface) -> None:
         self.client = client
+
+    def validate(self, endpoint: Endpoint, params: dict) -> None:
+        if self.client.validate_params:
+            raise_for_issues(endpoint=endpoint, params=params)
+
+    def read_response(
+        self,
+        response: Response,
+        endpoint: Endpoint,
+        params: dict
+    ) -> Union[List[StabilityAIContentResponse], Tuple[int, Any]]:
+        # Runs while the request holds its slot and key, so only a raw body is read here; decoding happens after release.
+        if response.status_code == 200 and params.get('raw_binary'):
+            return [
+                process_stream_response(
+                    response=response,
+                    output_format=OutputFormat.PNG,
+                    resource=get_resource_name(endpoint),
+                    in_memory=bool(params.get('in_memory'))
+                )
+            ]
+
+        return response.status_code, response.json()
+
+    def process_response(
+        self,
+        result: Union[List[StabilityAIContentResponse], Tuple[int, Any]],
+        endpoint: Endpoint,
+        params: dict,
+        message: str
+    ) -> List[StabilityAIContentResponse]:
+        if isinstance(result, list):
+            return result
+
+        status_code, data = result
+        if status_code == 200 and isinstance(data.get('artifacts'), list):
+            return process_articafts(
+                artifacts=data.get('artifacts'),
+                endpoint=endpoint,
+                output_format=params.get('output_format'),
+                executor=self.client.artifact_executor,
+                in_memory=bool(params.get('in_memory'))
+            )
+
+        raise StabilityAIError(status_code, message, data)
   
     def text_to_image(
         self, 
         **params: Unpack[TextToImageOptions]
     ) -> StabilityAIContentResponse:
+        self.validate(endpoint=Endpoint.TEXT_TO_IMAGE, params=params)
+
         url = make_url(
             version=APIVersion.V1, 
             resource=resource, 
             endpoint=f"{params.get('engine_id')}/{Endpoint.TEXT_TO_IMAGE}"
         )
         
-        filtered_params = filter_params(params=params, filters={'engine_id'})
+        filtered_params = filter_params(params=params, filters={'engine_id', *client_params})
 
-        response = requests.post(
+        result = self.client.request(
+            'POST',
             url,
             json={
                 **filtered_params
             },
             headers={
-                **self.client.headers,
-                'Accept': 'application/json',
+                'Accept': get_accept_header(params),
                 'Content-Type': 'application/json'
-            }
+            },
+            stream=bool(params.get('raw_binary')),
+            priority=params.get('priority'),
+            handler=lambda response: self.read_response(response=response, endpoint=Endpoint.TEXT_TO_IMAGE, params=params)
         )
-        
-        if response.status_code == 200 \
-            and isinstance(response.json().get('artifacts'), list):
-            return process_articafts(
-                artifacts=response.json().get('artifacts'),
-                endpoint=Endpoint.TEXT_TO_IMAGE
-            )
 
-        raise StabilityAIError(
-            response.status_code,
-            'Failed to run v1 generation text to image',
-            response.json()
+        return self.process_response(
+            result=result,
+            endpoint=Endpoint.TEXT_TO_IMAGE,
+            params=params,
+            message='Failed to run v1 generation text to image'
         )
   
     def image_to_image(
         self, 
         **params: Unpack[ImageToImageOptions]
     ) -> StabilityAIContentResponse:
+        self.validate(endpoint=Endpoint.IMAGE_TO_IMAGE, params=params)
+
         image_path = ImagePath(params.get('init_image'))
         
-        filtered_params = filter_params(params=params, filters={'init_image', 'engine_id', 'text_prompts'})
+        filtered_params = filter_params(params=params, filters={'init_image', 'engine_id', 'text_prompts', *client_params})
 
         url = make_url(
             version=APIVersion.V1, 
@@ -209,45 +230,45 @@ class Generation():
 
         text_prompts = get_multi_part_text_prompts(params.get('text_prompts'))
 
-        response = requests.post(
-            url,
-            files={
-                "init_image": open(image_path.filepath(), "rb")
-            },
-            data={
-                **filtered_params,
-                **text_prompts
-            },
-            headers={
-                **self.client.headers,
-                'Accept': 'application/json'
-            }
-        )
-
-        image_path.cleanup()
-        
-        if response.status_code == 200 \
-            and isinstance(response.json().get('artifacts'), list):
-            return process_articafts(
-                artifacts=response.json().get('artifacts'),
-                endpoint=Endpoint.IMAGE_TO_IMAGE
+        try:
+            result = self.client.request(
+                'POST',
+                url,
+                files={
+                    "init_image": image_path.open()
+                },
+                data={
+                    **filtered_params,
+                    **text_prompts
+                },
+                headers={
+                    'Accept': get_accept_header(params)
+                },
+                stream=bool(params.get('raw_binary')),
+                priority=params.get('priority'),
+                handler=lambda response: self.read_response(response=response, endpoint=Endpoint.IMAGE_TO_IMAGE, params=params)
             )
-
-        raise StabilityAIError(
-            response.status_code,
-            'Failed to run v1 generation image to image',
-            response.json()
+        finally:
+            image_path.cleanup()
+
+        return self.process_response(
+            result=result,
+            endpoint=Endpoint.IMAGE_TO_IMAGE,
+            params=params,
+            message='Failed to run v1 generation image to image'
         )
   
     def image_to_image_upscale(
         self, 
         **params: Unpack[ImageToImageUpscaleOptions]
     ) -> StabilityAIContentResponse:
+        self.validate(endpoint=Endpoint.IMAGE_TO_IMAGE_UPSCALE, params=params)
+
         image_path = ImagePath(params.get('image'))
 
         engine_id = EngineId.ESRGAN_V1_X2PLUS.value
         
-        filtered_params = filter_params(params=params, filters={'image'})
+        filtered_params = filter_params(params=params, filters={'image', *client_params})
 
         url = make_url(
             version=APIVersion.V1, 
@@ -255,46 +276,46 @@ class Generation():
             endpoint=f"{engine_id}/{Endpoint.IMAGE_TO_IMAGE_UPSCALE}"
         )
 
-        response = requests.post(
-            url,
-            files={
-                "image": open(image_path.filepath(), "rb")
-            },
-            data={
-                **filtered_params
-            },
-            headers={
-                **self.client.headers,
-                'Accept': 'application/json'
-            }
-        )
-
-        image_path.cleanup()
-        
-        if response.status_code == 200 \
-            and isinstance(response.json().get('artifacts'), list):
-            return process_articafts(
-                artifacts=response.json().get('artifacts'),
-                endpoint=Endpoint.IMAGE_TO_IMAGE_UPSCALE
+        try:
+            result = self.client.request(
+                'POST',
+                url,
+                files={
+                    "image": image_path.open()
+                },
+                data={
+                    **filtered_params
+                },
+                headers={
+                    'Accept': get_accept_header(params)
+                },
+                stream=bool(params.get('raw_binary')),
+                priority=params.get('priority'),
+                handler=lambda response: self.read_response(response=response, endpoint=Endpoint.IMAGE_TO_IMAGE_UPSCALE, params=params)
             )
-
-        raise StabilityAIError(
-            response.status_code,
-            'Failed to run v1 generation image to image',
-            response.json()
+        finally:
+            image_path.cleanup()
+
+        return self.process_response(
+            result=result,
+            endpoint=Endpoint.IMAGE_TO_IMAGE_UPSCALE,
+            params=params,
+            message='Failed to run v1 generation image to image'
         )
   
     def image_to_image_masking(
         self, 
         **params: Unpack[ImageToImageMaskingOptions]
     ) -> StabilityAIContentResponse:
+        self.validate(endpoint=Endpoint.IMAGE_TO_IMAGE_MASKING, params=params)
+
         image_path = ImagePath(params.get('init_image'))
         mask_path: Optional[ImagePath] = None
 
         if params.get('mask_image') is not None:
             mask_path = ImagePath(params.get('mask_image'))
         
-        filtered_params = filter_params(params=params, filters={'init_image', 'mask_image', 'engine_id', 'text_prompts'})
+        filtered_params = filter_params(params=params, filters={'init_image', 'mask_image', 'engine_id', 'text_prompts', *client_params})
 
         text_prompts = get_multi_part_text_prompts(params.get('text_prompts'))
 
@@ -305,38 +326,36 @@ class Generation():
         )
 
         files = {
-            "init_image": open(image_path.filepath(), "rb")
+            "init_image": image_path.open()
         }
 
         if mask_path is not None:
-            files['mask_image'] = open(mask_path.filepath(), "rb")
-
-        response = requests.post(
-            url,
-            files=files,
-            data={
-                **filtered_params,
-                **text_prompts
-            },
-            headers={
-                **self.client.headers,
-                'Accept': 'application/json'
-            }
-        )
-
-        image_path.cleanup()
-        if mask_path is not None:
-            mask_path.cleanup()
-        
-        if response.status_code == 200 \
-            and isinstance(response.json().get('artifacts'), list):
-            return process_articafts(
-                artifacts=response.json().get('artifacts'),
-                endpoint=Endpoint.IMAGE_TO_IMAGE_MASKING
+            files['mask_image'] = mask_path.open()
+
+        try:
+            result = self.client.request(
+                'POST',
+                url,
+                files=files,
+                data={
+                    **filtered_params,
+                    **text_prompts
+                },
+                headers={
+                    'Accept': get_accept_header(params)
+                },
+                stream=bool(params.get('raw_binary')),
+                priority=params.get('priority'),
+                handler=lambda response: self.read_response(response=response, endpoint=Endpoint.IMAGE_TO_IMAGE_MASKING, params=params)
             )
-
-        raise StabilityAIError(
-            response.status_code,
-            'Failed to run v1 generation image to image masking',
-            response.json()
+        finally:
+            image_path.cleanup()
+            if mask_path is not None:
+                mask_path.cleanup()
+
+        return self.process_response(
+            result=result,
+            endpoint=Endpoint.IMAGE_TO_IMAGE_MASKING,
+            params=params,
+            message='Failed to run v1 generation image to image masking'
         )
\ No newline at end of file
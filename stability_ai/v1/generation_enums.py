@@ -0,0 +1,64 @@
+from enum import Enum
+
+class Endpoint(str, Enum):
+    TEXT_TO_IMAGE = "text-to-image",
+    IMAGE_TO_IMAGE = "image-to-image",
+    IMAGE_TO_IMAGE_UPSCALE = "image-to-image/upscale",
+    IMAGE_TO_IMAGE_MASKING = "image-to-image/masking",
+
+class EngineId(str, Enum):
+    ESRGAN_V1_X2PLUS = "esrgan-v1-x2plus"
+    STABLE_DIFFUSION_XL_1024_V0_9 = "stable-diffusion-xl-1024-v0-9"
+    STABLE_DIFFUSION_XL_1024_V1_0 = "stable-diffusion-xl-1024-v1-0"
+    STABLE_DIFFUSION_V1_6 = "stable-diffusion-v1-6"
+    STABLE_DIFFUSION_512_V2_1 = "stable-diffusion-512-v2-1"
+    STABLE_DIFFUSION_XL_BETA_V2_2_2 = "stable-diffusion-xl-beta-v2-2-2"
+
+class ClipGuidancePreset(str, Enum):
+    FAST_BLUE = "FAST_BLUE"
+    FAST_GREEN = "FAST_GREEN"
+    NONE = "NONE"
+    SIMPLE = "SIMPLE"
+    SLOW = "SLOW"
+    SLOWER = "SLOWER"
+    SLOWEST = "SLOWEST"
+
+class Sampler(str, Enum):
+    DDIM = "DDIM"
+    DDPM = "DDPM"
+    K_DPMPP_2M = "K_DPMPP_2M"
+    K_DPMPP_2S_ANCESTRAL = "K_DPMPP_2S_ANCESTRAL"
+    K_DPM_2 = "K_DPM_2"
+    K_DPM_2_ANCESTRAL = "K_DPM_2_ANCESTRAL"
+    K_EULER = "K_EULER"
+    K_EULER_ANCESTRAL = "K_EULER_ANCESTRAL"
+    K_HEUN = "K_HEUN"
+    K_LMS = "K_LMS"
+
+class StylePreset(str, Enum):
+    MODEL_3D = "3d-model"
+    ANALOG_FILM = "analog-film"
+    ANIME = "anime"
+    CINEMATIC = "cinematic"
+    COMIC_BOOK = "comic-book"
+    DIGITAL_ART = "digital-art"
+    ENHANCE = "enhance"
+    FANTASY_ART = "fantasy-art"
+    ISOMETRIC = "isometric"
+    LINE_ART = "line-art"
+    LOW_POLY = "low-poly"
+    MODELING_COMPOUND = "modeling-compound"
+    NEON_PUNK = "neon-punk"
+    ORIGAMI = "origami"
+    PHOTOGRAPHIC = "photographic"
+    PIXEL_ART = "pixel-art"
+    TILE_TEXTURE = "tile-texture"
+
+class ImageToImageMode(str, Enum):
+    IMAGE_STRENGTH = 'IMAGE_STRENGTH'
+    STEP_SCHEDULE = 'STEP_SCHEDULE'
+
+class ImageToImageMaskSource(str, Enum):
+    MASK_IMAGE_WHITE = 'MASK_IMAGE_WHITE'
+    MASK_IMAGE_BLACK = 'MASK_IMAGE_BLACK'
+    INIT_IMAGE_ALPHA = 'INIT_IMAGE_ALPHA'
@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Optional
+)
+from typing_extensions import Unpack
+
+from stability_ai.util import StabilityAIContentResponse
+from stability_ai.client_interface import ClientInterface
+from stability_ai.v1.generation import (
+    Generation,
+    TextToImageOptions,
+    ImageToImageOptions,
+    ImageToImageUpscaleOptions,
+    ImageToImageMaskingOptions
+)
+
+# A stage receives the previous stage's output (or a pipeline input for the
+# first stage) and whether its own outputs should stay in memory.
+StageFunction = Callable[[Any, bool], List[StabilityAIContentResponse]]
+
+class Stage:
+    def __init__(self, name: str, run: StageFunction, concurrency: int = 1) -> None:
+        self.name = name
+        self.run = run
+        self.concurrency = concurrency
+
+class Pipeline:
+    def __init__(self, client: ClientInterface) -> None:
+        self.client = client
+        self.stages: List[Stage] = []
+
+    @property
+    def generation(self) -> Generation:
+        return Generation(client=self.client)
+
+    def stage(self, name: str, run: StageFunction, concurrency: int = 1) -> 'Pipeline':
+        self.stages.append(Stage(name=name, run=run, concurrency=concurrency))
+        return self
+
+    def text_to_image(self, concurrency: int = 1, **params: Unpack[TextToImageOptions]) -> 'Pipeline':
+        return self.stage(
+            name='text_to_image',
+            run=lambda overrides, in_memory: self.generation.text_to_image(
+                **{**params, **(overrides or {}), 'in_memory': in_memory}
+            ),
+            concurrency=concurrency
+        )
+
+    def image_to_image(self, concurrency: int = 1, **params: Unpack[ImageToImageOptions]) -> 'Pipeline':
+        return self.stage(
+            name='image_to_image',
+            run=lambda image, in_memory: self.generation.image_to_image(
+                **{**params, 'init_image': image, 'in_memory': in_memory}
+            ),
+            concurrency=concurrency
+        )
+
+    def image_to_image_masking(self, concurrency: int = 1, **params: Unpack[ImageToImageMaskingOptions]) -> 'Pipeline':
+        return self.stage(
+            name='image_to_image_masking',
+            run=lambda image, in_memory: self.generation.image_to_image_masking(
+                **{**params, 'init_image': image, 'in_memory': in_memory}
+            ),
+            concurrency=concurrency
+        )
+
+    def image_to_image_upscale(self, concurrency: int = 1, **params: Unpack[ImageToImageUpscaleOptions]) -> 'Pipeline':
+        return self.stage(
+            name='image_to_image_upscale',
+            run=lambda image, in_memory: self.generation.image_to_image_upscale(
+                **{**params, 'image': image, 'in_memory': in_memory}
+            ),
+            concurrency=concurrency
+        )
+
+    def run(self, inputs: Iterable[Any], in_memory: bool = False) -> List[List[StabilityAIContentResponse]]:
+        if len(self.stages) == 0:
+            raise ValueError("Pipeline has no stages")
+
+        inputs = list(inputs)
+        last_index = len(self.stages) - 1
+        results: List[List[StabilityAIContentResponse]] = [[] for _ in inputs]
+        errors: List[BaseException] = []
+        condition = threading.Condition()
+        pending = 0
+
+        executors = [
+            ThreadPoolExecutor(max_workers=stage.concurrency, thread_name_prefix=f"stability_ai_{stage.name}")
+            for stage in self.stages
+        ]
+
+        def submit(stage_index: int, input_index: int, value: Any) -> None:
+            nonlocal pending
+            with condition:
+                if len(errors) > 0:
+                    return
+                pending += 1
+
+            stage = self.stages[stage_index]
+            future = executors[stage_index].submit(stage.run, value, in_memory or stage_index < last_index)
+            future.add_done_callback(lambda done: complete(stage_index, input_index, done))
+
+        def complete(stage_index: int, input_index: int, future: Future) -> None:
+            nonlocal pending
+            # Exceptions raised in a done callback are swallowed, so record them here or run() never returns.
+            try:
+                for output in future.result():
+                    # Filtered or errored artifacts end the chain rather than spend credits on later stages.
+                    if stage_index == last_index or output.content_filtered or output.errored:
+                        with condition:
+                            results[input_index].append(output)
+                    else:
+                        submit(stage_index + 1, input_index, output)
+            except BaseException as error:
+                with condition:
+                    errors.append(error)
+            finally:
+                with condition:
+                    pending -= 1
+                    condition.notify_all()
+
+        try:
+            for input_index, value in enumerate(inputs):
+                submit(0, input_index, value)
+
+            with condition:
+                condition.wait_for(lambda: pending == 0)
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+        if len(errors) > 0:
+            raise errors[0]
+
+        return results
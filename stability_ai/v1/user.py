@@ -1,4 +1,3 @@
-import requests
 from enum import Enum
 from pydantic import BaseModel
 from typing import (
@@ -43,7 +42,7 @@ class User():
   
     def account(self) -> AccountResponse:
         url = make_url(APIVersion.V1, resource=resource, endpoint=Endpoint.ACCOUNT)
-        response = requests.get(url, headers=self.client.headers)
+        response = self.client.request('GET', url)
 
         if response.status_code == 200:
             try:
@@ -55,7 +54,7 @@ class User():
   
     def balance(self) -> BalanceResponse:
         url = make_url(APIVersion.V1, resource=resource, endpoint=Endpoint.BALANCE)
-        response = requests.get(url, headers=self.client.headers)
+        response = self.client.request('GET', url)
 
         if response.status_code == 200:
             try:
@@ -0,0 +1,284 @@
+import os
+import struct
+from enum import Enum
+from pydantic import BaseModel
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Tuple
+)
+
+from stability_ai.util import (
+    ImageInput,
+    OutputFormat,
+    StabilityAIContentResponse,
+    is_valid_file
+)
+from stability_ai.error import StabilityAIError
+from stability_ai.v1.generation_enums import (
+    Endpoint,
+    EngineId,
+    ImageToImageMode,
+    ImageToImageMaskSource
+)
+
+MIN_STEPS = 10
+MAX_STEPS = 50
+MIN_CFG_SCALE = 0
+MAX_CFG_SCALE = 35
+MIN_SAMPLES = 1
+MAX_SAMPLES = 10
+MAX_SEED = 4294967295
+MAX_TEXT_PROMPTS = 10
+MAX_TEXT_PROMPT_LENGTH = 2000
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_UPSCALE_INPUT_PIXELS = 1048576
+MAX_UPSCALE_OUTPUT_DIMENSION = 4096
+DEFAULT_DIMENSION = 512
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+IMAGE_OUTPUT_FORMATS = (OutputFormat.PNG, OutputFormat.JPEG, OutputFormat.WEBP)
+
+class EngineRules(BaseModel):
+    dimensions: Optional[FrozenSet[Tuple[int, int]]] = None
+    min_dimension: int = 128
+    max_dimension: Optional[int] = None
+    dimension_multiple: int = 64
+    max_pixels: Optional[int] = None
+
+SDXL_RULES = EngineRules(
+    dimensions=frozenset({
+        (1024, 1024), (1152, 896), (896, 1152), (1216, 832), (832, 1216),
+        (1344, 768), (768, 1344), (1536, 640), (640, 1536)
+    })
+)
+
+ENGINE_RULES: Dict[EngineId, EngineRules] = {
+    EngineId.STABLE_DIFFUSION_XL_1024_V0_9: SDXL_RULES,
+    EngineId.STABLE_DIFFUSION_XL_1024_V1_0: SDXL_RULES,
+    EngineId.STABLE_DIFFUSION_V1_6: EngineRules(min_dimension=320, max_dimension=1536),
+    EngineId.STABLE_DIFFUSION_512_V2_1: EngineRules(max_pixels=1048576),
+    EngineId.STABLE_DIFFUSION_XL_BETA_V2_2_2: EngineRules(max_dimension=896, max_pixels=512 * 896),
+}
+
+def get_engine_rules(engine_id) -> Optional[EngineRules]:
+    try:
+        return ENGINE_RULES.get(EngineId(engine_id))
+    except ValueError:
+        return None
+
+def get_image_bytes(image: ImageInput) -> Optional[bytes]:
+    if isinstance(image, StabilityAIContentResponse):
+        image = image.content if image.content is not None else image.filepath
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    return None
+
+def get_image_size(image: ImageInput) -> Optional[int]:
+    data = get_image_bytes(image)
+    if data is not None:
+        return len(data)
+    if isinstance(image, StabilityAIContentResponse):
+        image = image.filepath
+    if isinstance(image, str) and is_valid_file(image):
+        return os.path.getsize(image)
+    return None
+
+def get_png_dimensions(image: ImageInput) -> Optional[Tuple[int, int]]:
+    header = get_image_bytes(image)
+    if header is None:
+        if isinstance(image, StabilityAIContentResponse):
+            image = image.filepath
+        if not isinstance(image, str) or not is_valid_file(image):
+            return None
+        with open(image, 'rb') as file:
+            header = file.read(24)
+
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def check_number(issues: List[str], params: dict, key: str) -> bool:
+    value = params.get(key)
+    if value is not None and not is_number(value):
+        issues.append(f"{key} must be a number, got {type(value).__name__}")
+        return False
+    return True
+
+def check_range(issues: List[str], params: dict, key: str, minimum: float, maximum: float) -> None:
+    value = params.get(key)
+    if check_number(issues, params, key) and value is not None and not minimum <= value <= maximum:
+        issues.append(f"{key} must be between {minimum} and {maximum}, got {value}")
+
+def check_dimensions(issues: List[str], rules: EngineRules, width: Optional[int], height: Optional[int], label: str) -> None:
+    if rules.dimensions is not None:
+        if width is not None and height is not None and (width, height) not in rules.dimensions:
+            allowed = ', '.join(f"{w}x{h}" for w, h in sorted(rules.dimensions))
+            issues.append(f"{label} {width}x{height} is not supported by this engine. Allowed: {allowed}")
+        return
+
+    for key, value in (('width', width), ('height', height)):
+        if value is None:
+            continue
+        if value < rules.min_dimension:
+            issues.append(f"{label} {key} must be at least {rules.min_dimension}, got {value}")
+        if rules.max_dimension is not None and value > rules.max_dimension:
+            issues.append(f"{label} {key} must be at most {rules.max_dimension}, got {value}")
+        if value % rules.dimension_multiple != 0:
+            issues.append(f"{label} {key} must be a multiple of {rules.dimension_multiple}, got {value}")
+
+    if rules.max_pixels is not None and width is not None and height is not None and width * height > rules.max_pixels:
+        issues.append(f"{label} {width}x{height} exceeds the engine limit of {rules.max_pixels} pixels")
+
+def check_image(issues: List[str], params: dict, key: str, required: bool = True) -> None:
+    image = params.get(key)
+    if image is None:
+        if required:
+            issues.append(f"{key} is required")
+        return
+
+    size = get_image_size(image)
+    if size is not None and size > MAX_IMAGE_BYTES:
+        issues.append(f"{key} is {size} bytes, larger than the {MAX_IMAGE_BYTES} byte limit")
+
+def check_output_format(issues: List[str], params: dict) -> None:
+    output_format = params.get('output_format')
+    if output_format is not None and output_format not in IMAGE_OUTPUT_FORMATS:
+        allowed = ', '.join(image_format.value for image_format in IMAGE_OUTPUT_FORMATS)
+        name = output_format.value if isinstance(output_format, Enum) else output_format
+        issues.append(f"output_format must be one of {allowed} for image generation, got {name}")
+
+def check_raw_binary(issues: List[str], params: dict) -> None:
+    if not params.get('raw_binary'):
+        return
+    samples = params.get('samples')
+    if is_number(samples) and samples > 1:
+        issues.append("raw_binary only supports a single sample")
+    if params.get('output_format') not in (None, OutputFormat.PNG):
+        issues.append("raw_binary only supports PNG output")
+
+def check_generation_params(params: dict) -> List[str]:
+    issues: List[str] = []
+
+    if params.get('engine_id') is None:
+        issues.append("engine_id is required")
+
+    text_prompts = params.get('text_prompts')
+    if not text_prompts:
+        issues.append("text_prompts must contain at least one prompt")
+    elif len(text_prompts) > MAX_TEXT_PROMPTS:
+        issues.append(f"text_prompts must contain at most {MAX_TEXT_PROMPTS} prompts, got {len(text_prompts)}")
+    else:
+        for index, text_prompt in enumerate(text_prompts):
+            text = text_prompt.get('text')
+            if not text:
+                issues.append(f"text_prompts[{index}] text must not be empty")
+            elif len(text) > MAX_TEXT_PROMPT_LENGTH:
+                issues.append(f"text_prompts[{index}] text must be at most {MAX_TEXT_PROMPT_LENGTH} characters")
+        weights = [text_prompt.get('weight', 1) for text_prompt in text_prompts]
+        for index, weight in enumerate(weights):
+            if weight is not None and not is_number(weight):
+                issues.append(f"text_prompts[{index}] weight must be a number, got {type(weight).__name__}")
+        if all(is_number(weight) and weight <= 0 for weight in weights):
+            issues.append("text_prompts must contain at least one prompt with a positive weight")
+
+    check_range(issues, params, 'steps', MIN_STEPS, MAX_STEPS)
+    check_range(issues, params, 'cfg_scale', MIN_CFG_SCALE, MAX_CFG_SCALE)
+    check_range(issues, params, 'samples', MIN_SAMPLES, MAX_SAMPLES)
+    check_range(issues, params, 'seed', 0, MAX_SEED)
+    check_output_format(issues, params)
+    check_raw_binary(issues, params)
+
+    return issues
+
+def check_init_image_dimensions(issues: List[str], params: dict, key: str) -> None:
+    rules = get_engine_rules(params.get('engine_id'))
+    dimensions = get_png_dimensions(params.get(key)) if params.get(key) is not None else None
+    if rules is not None and dimensions is not None:
+        check_dimensions(issues, rules, dimensions[0], dimensions[1], label=key)
+
+def validate_text_to_image(params: dict) -> List[str]:
+    issues = check_generation_params(params)
+
+    rules = get_engine_rules(params.get('engine_id'))
+    if rules is not None and check_number(issues, params, 'width') and check_number(issues, params, 'height'):
+        # The API fills in missing dimensions with its defaults, so check those too.
+        width = DEFAULT_DIMENSION if params.get('width') is None else params.get('width')
+        height = DEFAULT_DIMENSION if params.get('height') is None else params.get('height')
+        check_dimensions(issues, rules, width, height, label='dimensions')
+
+    return issues
+
+def validate_image_to_image(params: dict) -> List[str]:
+    issues = check_generation_params(params)
+    check_image(issues, params, 'init_image')
+    check_init_image_dimensions(issues, params, 'init_image')
+
+    if params.get('mode') == ImageToImageMode.IMAGE_STRENGTH and params.get('image_strength') is None:
+        issues.append("image_strength is required when mode is IMAGE_STRENGTH")
+    check_range(issues, params, 'image_strength', 0, 1)
+    check_range(issues, params, 'step_schedule_start', 0, 1)
+    check_range(issues, params, 'step_schedule_end', 0, 1)
+
+    return issues
+
+def validate_image_to_image_upscale(params: dict) -> List[str]:
+    issues: List[str] = []
+    check_image(issues, params, 'image')
+    check_output_format(issues, params)
+    check_raw_binary(issues, params)
+
+    if params.get('width') is not None and params.get('height') is not None:
+        issues.append("Only one of width or height may be set for upscaling")
+    for key in ('width', 'height'):
+        check_range(issues, params, key, 512, MAX_UPSCALE_OUTPUT_DIMENSION)
+
+    dimensions = get_png_dimensions(params.get('image')) if params.get('image') is not None else None
+    if dimensions is not None and dimensions[0] * dimensions[1] > MAX_UPSCALE_INPUT_PIXELS:
+        issues.append(f"image {dimensions[0]}x{dimensions[1]} exceeds the upscale limit of {MAX_UPSCALE_INPUT_PIXELS} pixels")
+
+    return issues
+
+def validate_image_to_image_masking(params: dict) -> List[str]:
+    issues = check_generation_params(params)
+    check_image(issues, params, 'init_image')
+    check_init_image_dimensions(issues, params, 'init_image')
+
+    mask_source = params.get('mask_source')
+    requires_mask = mask_source in (ImageToImageMaskSource.MASK_IMAGE_WHITE, ImageToImageMaskSource.MASK_IMAGE_BLACK)
+    check_image(issues, params, 'mask_image', required=requires_mask)
+    if mask_source is None:
+        issues.append("mask_source is required")
+
+    return issues
+
+VALIDATORS = {
+    Endpoint.TEXT_TO_IMAGE: validate_text_to_image,
+    Endpoint.IMAGE_TO_IMAGE: validate_image_to_image,
+    Endpoint.IMAGE_TO_IMAGE_UPSCALE: validate_image_to_image_upscale,
+    Endpoint.IMAGE_TO_IMAGE_MASKING: validate_image_to_image_masking,
+}
+
+def validate(endpoint: Endpoint, params: dict) -> List[str]:
+    return VALIDATORS[endpoint](params)
+
+def validate_many(manifest: Iterable[Tuple[Endpoint, dict]]) -> Dict[int, List[str]]:
+    failures: Dict[int, List[str]] = {}
+    for index, (endpoint, params) in enumerate(manifest):
+        issues = validate(endpoint, params)
+        if len(issues) > 0:
+            failures[index] = issues
+    return failures
+
+def raise_for_issues(endpoint: Endpoint, params: dict) -> None:
+    issues = validate(endpoint, params)
+    if len(issues) > 0:
+        name = endpoint.value if isinstance(endpoint, Enum) else endpoint
+        raise StabilityAIError(400, f"Invalid v1 generation {name} parameters", issues)
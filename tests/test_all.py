@@ -21,4 +21,608 @@ def test_fetch_user_balance():
     result = stability_ai.v1.user.balance()
     print(result)
     assert result is not None
-    assert isinstance(result.credits, float)
\ No newline at end of file
+    assert isinstance(result.credits, float)
+
+class FakeStreamResponse:
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+def test_process_stream_response():
+    from stability_ai.util import process_stream_response, OutputFormat, ContentType
+
+    progress = []
+    response = FakeStreamResponse([b'abc', b'', b'defg'], headers={'Content-Length': '7'})
+    result = process_stream_response(
+        response=response,
+        output_format=OutputFormat.MP4,
+        resource='test',
+        on_progress=lambda written, total: progress.append((written, total))
+    )
+
+    assert response.closed
+    assert result.filename.endswith('.mp4')
+    assert result.content_type == ContentType.VIDEO
+    assert progress == [(3, 7), (7, 7)]
+    with open(result.filepath, 'rb') as file:
+        assert file.read() == b'abcdefg'
+
+def test_process_stream_response_writes_to_sink():
+    import io
+    from stability_ai.util import process_stream_response, OutputFormat
+
+    sink = io.BytesIO()
+    result = process_stream_response(
+        response=FakeStreamResponse([b'glb', b'data']),
+        output_format=OutputFormat.GLB,
+        resource='test',
+        file=sink
+    )
+
+    assert sink.getvalue() == b'glbdata'
+    assert result.filepath is None
+    assert result.content is None
+
+def test_stream_download_resumes_with_range(monkeypatch, tmp_path):
+    import requests
+    from stability_ai import util
+
+    calls = []
+
+    class FakeDownload(FakeStreamResponse):
+        def __init__(self, status_code, chunks, headers, fail=False):
+            super().__init__(chunks, headers)
+            self.status_code = status_code
+            self.fail = fail
+
+        def iter_content(self, chunk_size=1):
+            yield from self.chunks
+            if self.fail:
+                raise requests.exceptions.ConnectionError('Read timed out.')
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+
+    def fake_get(url, headers=None, stream=False, timeout=None):
+        assert timeout == util.DEFAULT_DOWNLOAD_TIMEOUT
+        calls.append(headers.get('Range'))
+        if len(calls) == 1:
+            return FakeDownload(200, [b'hello '], {'Content-Length': '11'}, fail=True)
+        return FakeDownload(206, [b'world'], {'Content-Range': 'bytes 6-10/11'})
+
+    monkeypatch.setattr(util.requests, 'get', fake_get)
+
+    filepath = util.stream_download(url='https://example.com/out.glb', filepath=str(tmp_path / 'out.glb'))
+
+    assert calls == [None, 'bytes=6-']
+    with open(filepath, 'rb') as file:
+        assert file.read() == b'hello world'
+
+def test_client_key_pool_fails_over_on_rate_limit(monkeypatch):
+    import requests
+    from stability_ai.client import Client
+    from stability_ai.key_pool import Credential
+
+    seen_keys = []
+
+    class FakeResponse:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.headers = {'Retry-After': '30'} if status_code == 429 else {}
+
+        def close(self):
+            pass
+
+    def fake_request(method, url, headers=None, **kwargs):
+        seen_keys.append(headers['Authorization'])
+        return FakeResponse(429 if headers['Authorization'] == 'Bearer key-a' else 200)
+
+    monkeypatch.setattr(requests, 'request', fake_request)
+
+    client = Client(credentials=[
+        Credential(api_key='key-a', organization='org-a'),
+        Credential(api_key='key-b', organization='org-b')
+    ])
+
+    assert client.request('GET', 'https://api.stability.ai/v1/user/balance').status_code == 200
+    assert seen_keys == ['Bearer key-a', 'Bearer key-b']
+
+    seen_keys.clear()
+    assert client.request('GET', 'https://api.stability.ai/v1/user/balance').status_code == 200
+    assert seen_keys == ['Bearer key-b']
+
+def test_process_artifacts_in_process_pool():
+    import base64
+    import hashlib
+    from concurrent.futures import ProcessPoolExecutor
+    from stability_ai.v1.generation import process_articafts, Endpoint
+
+    contents = [b'first artifact', b'second artifact']
+    artifacts = [
+        {'base64': base64.b64encode(content).decode(), 'finish_reason': 'SUCCESS', 'seed': index}
+        for index, content in enumerate(contents)
+    ]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = process_articafts(artifacts=artifacts, endpoint=Endpoint.TEXT_TO_IMAGE, executor=executor)
+
+    assert [result.seed for result in results] == [0, 1]
+    for result, content in zip(results, contents):
+        assert result.sha256 == hashlib.sha256(content).hexdigest()
+        with open(result.filepath, 'rb') as file:
+            assert file.read() == content
+
+def test_process_artifacts_converts_png_to_requested_format():
+    Image = pytest.importorskip('PIL.Image')
+    import io
+    import base64
+    import hashlib
+    from stability_ai.util import OutputFormat
+    from stability_ai.v1.generation import process_articafts, Endpoint
+
+    buffer = io.BytesIO()
+    Image.new('RGBA', (8, 8), (255, 0, 0, 128)).save(buffer, format='PNG')
+    artifacts = [{'base64': base64.b64encode(buffer.getvalue()).decode(), 'finish_reason': 'SUCCESS', 'seed': 1}]
+
+    for output_format, signature in ((OutputFormat.JPEG, b'\xff\xd8\xff'), (OutputFormat.WEBP, b'RIFF')):
+        [result] = process_articafts(artifacts=artifacts, endpoint=Endpoint.TEXT_TO_IMAGE, output_format=output_format, in_memory=True)
+
+        assert result.output_format == output_format
+        assert result.filename.endswith(f".{output_format.value}")
+        assert result.content.startswith(signature)
+        assert result.sha256 == hashlib.sha256(result.content).hexdigest()
+        with Image.open(io.BytesIO(result.content)) as image:
+            assert image.format == output_format.value.upper()
+            assert image.size == (8, 8)
+
+def test_scheduler_reserves_interactive_and_preempts_queued_batch():
+    import threading
+    import time
+    from stability_ai.error import StabilityAIError
+    from stability_ai.scheduler import RequestScheduler, Priority
+
+    scheduler = RequestScheduler(max_concurrency=2, max_queued=1)
+
+    batch_ticket = scheduler.acquire(Priority.BATCH)
+    errors = []
+
+    def queued_batch():
+        try:
+            scheduler.release(scheduler.acquire(Priority.BATCH))
+        except StabilityAIError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=queued_batch)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while scheduler.queued() == 0:
+        assert time.monotonic() < deadline, 'batch request was never queued'
+        time.sleep(0.01)
+
+    interactive_ticket = scheduler.acquire(Priority.INTERACTIVE)
+    assert interactive_ticket.dispatched
+
+    waiting = threading.Thread(target=lambda: scheduler.release(scheduler.acquire(Priority.INTERACTIVE)))
+    waiting.start()
+    thread.join(timeout=5)
+
+    assert len(errors) == 1
+    assert 'preempted' in str(errors[0])
+
+    scheduler.release(batch_ticket)
+    waiting.join(timeout=5)
+    assert not waiting.is_alive()
+    scheduler.release(interactive_ticket)
+
+def test_pipeline_passes_buffers_between_stages_and_fans_out():
+    from stability_ai.util import ImagePath, OutputFormat, process_array_buffer_response
+    from stability_ai.v1.pipeline import Pipeline
+
+    def generate(prompt, in_memory):
+        return [
+            process_array_buffer_response(data=f"{prompt}-{sample}".encode(), output_format=OutputFormat.PNG, resource='test', in_memory=in_memory)
+            for sample in range(2)
+        ]
+
+    def upscale(image, in_memory):
+        source = ImagePath(image).open().read()
+        return [process_array_buffer_response(data=source + b'-up', output_format=OutputFormat.PNG, resource='test', in_memory=in_memory)]
+
+    pipeline = Pipeline(client=stability_ai.default_client) \
+        .stage('generate', generate, concurrency=2) \
+        .stage('upscale', upscale, concurrency=2)
+
+    results = pipeline.run(['a', 'b'])
+
+    assert len(results) == 2
+    for prompt, outputs in zip(['a', 'b'], results):
+        assert len(outputs) == 2
+        contents = set()
+        for output in outputs:
+            assert output.content is None
+            with open(output.filepath, 'rb') as file:
+                contents.add(file.read())
+        assert contents == {f"{prompt}-0-up".encode(), f"{prompt}-1-up".encode()}
+
+def test_validation_rejects_invalid_params_before_sending(monkeypatch):
+    import requests
+    from stability_ai.error import StabilityAIError, StabilityAIErrorName
+    from stability_ai.v1.generation import Endpoint, EngineId, ImageToImageMode, ImageToImageMaskSource, TextPrompt
+    from stability_ai.v1.validation import validate_many
+
+    def fail_request(*args, **kwargs):
+        raise AssertionError('request should not be sent')
+
+    monkeypatch.setattr(requests, 'request', fail_request)
+
+    prompts = [TextPrompt(text="a big goat", weight=0.5)]
+
+    with pytest.raises(StabilityAIError) as error:
+        stability_ai.v1.generation.text_to_image(
+            engine_id=EngineId.STABLE_DIFFUSION_XL_1024_V1_0,
+            text_prompts=prompts,
+            width=512,
+            height=512
+        )
+    assert error.value.name == StabilityAIErrorName.INVALID_REQUEST_ERROR
+
+    failures = validate_many([
+        (Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_XL_1024_V1_0, 'text_prompts': prompts, 'width': 1216, 'height': 832}),
+        (Endpoint.IMAGE_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts, 'init_image': b'image', 'mode': ImageToImageMode.IMAGE_STRENGTH}),
+        (Endpoint.IMAGE_TO_IMAGE_MASKING, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts, 'init_image': b'image', 'mask_source': ImageToImageMaskSource.MASK_IMAGE_BLACK}),
+        (Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts, 'steps': 100}),
+    ])
+
+    assert sorted(failures.keys()) == [1, 2, 3]
+    assert failures[1] == ["image_strength is required when mode is IMAGE_STRENGTH"]
+    assert failures[2] == ["mask_image is required"]
+    assert failures[3] == ["steps must be between 10 and 50, got 100"]
+
+def test_text_to_image_raw_binary_streams_png(monkeypatch):
+    import requests
+    from stability_ai.v1.generation import EngineId, TextPrompt
+
+    sent = {}
+
+    class FakeBinaryResponse(FakeStreamResponse):
+        status_code = 200
+
+    def fake_request(method, url, headers=None, stream=False, **kwargs):
+        sent['accept'] = headers['Accept']
+        sent['stream'] = stream
+        return FakeBinaryResponse([b'\x89PNG', b'data'], headers={'Finish-Reason': 'CONTENT_FILTERED', 'Seed': '42'})
+
+    monkeypatch.setattr(requests, 'request', fake_request)
+
+    results = stability_ai.v1.generation.text_to_image(
+        engine_id=EngineId.STABLE_DIFFUSION_V1_6,
+        text_prompts=[TextPrompt(text="a big goat", weight=0.5)],
+        raw_binary=True,
+        in_memory=True
+    )
+
+    assert sent == {'accept': 'image/png', 'stream': True}
+    assert len(results) == 1
+    assert results[0].content == b'\x89PNGdata'
+    assert results[0].seed == 42
+    assert results[0].content_filtered
+
+def test_client_fails_over_between_base_urls(monkeypatch):
+    import datetime
+    import requests
+    from stability_ai.client import Client
+
+    seen_urls = []
+
+    class FakeResponse:
+        status_code = 200
+        headers = {}
+        elapsed = datetime.timedelta(seconds=0.1)
+
+        def close(self):
+            pass
+
+    def fake_request(method, url, headers=None, **kwargs):
+        seen_urls.append(url)
+        if url.startswith('https://gateway-a.example.com'):
+            raise requests.exceptions.ConnectionError()
+        return FakeResponse()
+
+    monkeypatch.setattr(requests, 'request', fake_request)
+
+    client = Client(api_key='key', base_urls=['https://gateway-a.example.com', 'https://gateway-b.example.com/'])
+
+    assert client.request('GET', 'https://api.stability.ai/v1/user/balance').status_code == 200
+    assert seen_urls == ['https://gateway-a.example.com/v1/user/balance', 'https://gateway-b.example.com/v1/user/balance']
+
+    seen_urls.clear()
+    client.request('GET', 'https://api.stability.ai/v1/user/balance')
+    assert seen_urls == ['https://gateway-b.example.com/v1/user/balance']
+
+def test_credential_rejects_non_positive_weight():
+    import pydantic
+    from stability_ai.key_pool import Credential
+
+    with pytest.raises(pydantic.ValidationError):
+        Credential(api_key='key', weight=0)
+
+def test_client_creates_one_artifact_executor_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from stability_ai.client import Client
+    from stability_ai.util import OutputFormat
+    from stability_ai.v1.generation import Endpoint, EngineId, TextPrompt
+    from stability_ai.v1.validation import validate
+
+    with Client(api_key='key', artifact_workers=1) as client:
+        with ThreadPoolExecutor(max_workers=8) as threads:
+            executors = set(threads.map(lambda _: id(client.artifact_executor), range(32)))
+        assert len(executors) == 1
+    assert client._artifact_executor is None
+
+    issues = validate(Endpoint.TEXT_TO_IMAGE, {
+        'engine_id': EngineId.STABLE_DIFFUSION_V1_6,
+        'text_prompts': [TextPrompt(text="a big goat", weight=0.5)],
+        'output_format': OutputFormat.MP4
+    })
+    assert issues == ["output_format must be one of png, jpeg, webp for image generation, got mp4"]
+
+def test_scheduler_defaults_allow_single_slot_and_skip_rejected_tags():
+    from stability_ai.error import StabilityAIError
+    from stability_ai.scheduler import RequestScheduler, Priority, PriorityClass
+
+    scheduler = RequestScheduler(max_concurrency=1, max_queued=0)
+    ticket = scheduler.acquire(Priority.BATCH)
+    tag = scheduler.last_tags[Priority.BATCH]
+
+    with pytest.raises(StabilityAIError):
+        scheduler.acquire(Priority.BATCH)
+
+    assert scheduler.last_tags[Priority.BATCH] == tag
+    scheduler.release(ticket)
+
+    with pytest.raises(ValueError, match='interactive'):
+        RequestScheduler(max_concurrency=2, classes={Priority.BATCH: PriorityClass()})
+
+def test_pipeline_stops_filtered_artifacts():
+    from stability_ai.util import FinishReason, OutputFormat, process_array_buffer_response
+    from stability_ai.v1.pipeline import Pipeline
+
+    upscaled = []
+
+    def generate(prompt, in_memory):
+        return [
+            process_array_buffer_response(data=b'ok', output_format=OutputFormat.PNG, resource='test', in_memory=in_memory),
+            process_array_buffer_response(data=b'blurred', output_format=OutputFormat.PNG, resource='test', in_memory=in_memory, finish_reason=FinishReason.CONTENT_FILTERED)
+        ]
+
+    def upscale(image, in_memory):
+        upscaled.append(image.content)
+        return [image]
+
+    results = Pipeline(client=stability_ai.default_client) \
+        .stage('generate', generate) \
+        .stage('upscale', upscale) \
+        .run(['a'])
+
+    assert upscaled == [b'ok']
+    assert sorted(result.content_filtered for result in results[0]) == [False, True]
+
+def test_pipeline_raises_when_stage_returns_non_list():
+    import threading
+    from stability_ai.v1.pipeline import Pipeline
+
+    errors = []
+
+    def run():
+        try:
+            Pipeline(client=stability_ai.default_client).stage('broken', lambda value, in_memory: None).run([1])
+        except TypeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive(), 'pipeline hung on a stage that did not return a list'
+    assert len(errors) == 1
+
+def test_validation_applies_default_dimensions_and_reports_types():
+    from stability_ai.v1.generation import Endpoint, EngineId, TextPrompt
+    from stability_ai.v1.validation import validate
+
+    prompts = [TextPrompt(text="a big goat", weight=0.5)]
+
+    assert validate(Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_XL_1024_V1_0, 'text_prompts': prompts}) != []
+    assert validate(Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_XL_1024_V1_0, 'text_prompts': prompts, 'width': 512}) != []
+    assert validate(Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts}) == []
+    assert validate(Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts, 'steps': '30'}) == [
+        "steps must be a number, got str"
+    ]
+    assert validate(Endpoint.TEXT_TO_IMAGE, {'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': [TextPrompt(text="a big goat", weight='0.5')]}) == [
+        "text_prompts[0] weight must be a number, got str"
+    ]
+    assert "dimensions width must be at least 320, got 0" in validate(Endpoint.TEXT_TO_IMAGE, {
+        'engine_id': EngineId.STABLE_DIFFUSION_V1_6, 'text_prompts': prompts, 'width': 0, 'height': 0
+    })
+
+def test_raw_binary_body_is_read_while_slot_and_key_are_held(monkeypatch):
+    import requests
+    from stability_ai.client import Client
+    from stability_ai.key_pool import Credential
+    from stability_ai.scheduler import Priority
+    from stability_ai.v1.generation import EngineId, TextPrompt
+
+    client = Client(credentials=[Credential(api_key='key')], max_concurrency=2)
+    observed = []
+
+    class ObservedResponse(FakeStreamResponse):
+        status_code = 200
+
+        def iter_content(self, chunk_size=1):
+            observed.append((client.scheduler.in_flight[Priority.BATCH], client.key_pool.states[0].in_flight))
+            yield b'\x89PNGdata'
+
+    monkeypatch.setattr(requests, 'request', lambda method, url, **kwargs: ObservedResponse([]))
+
+    client.v1.generation.text_to_image(
+        engine_id=EngineId.STABLE_DIFFUSION_V1_6,
+        text_prompts=[TextPrompt(text="a big goat", weight=0.5)],
+        raw_binary=True,
+        in_memory=True,
+        priority=Priority.BATCH
+    )
+
+    assert observed == [(1, 1)]
+    assert client.scheduler.in_flight[Priority.BATCH] == 0
+    assert client.key_pool.states[0].in_flight == 0
+
+def test_json_artifacts_are_decoded_after_slot_and_key_are_released(monkeypatch):
+    import base64
+    import requests
+    from stability_ai.client import Client
+    from stability_ai.key_pool import Credential
+    from stability_ai.scheduler import Priority
+    from stability_ai.v1 import generation
+    from stability_ai.v1.generation import EngineId, TextPrompt
+
+    client = Client(credentials=[Credential(api_key='key')], max_concurrency=2)
+    observed = []
+
+    class JSONResponse:
+        status_code = 200
+        headers = {}
+
+        def json(self):
+            return {'artifacts': [{'base64': base64.b64encode(b'png').decode(), 'finishReason': 'SUCCESS', 'seed': 1}]}
+
+    def observe_artifacts(**kwargs):
+        observed.append((client.scheduler.in_flight[Priority.BATCH], client.key_pool.states[0].in_flight))
+        return process_articafts(**kwargs)
+
+    process_articafts = generation.process_articafts
+    monkeypatch.setattr(generation, 'process_articafts', observe_artifacts)
+    monkeypatch.setattr(requests, 'request', lambda method, url, **kwargs: JSONResponse())
+
+    [result] = client.v1.generation.text_to_image(
+        engine_id=EngineId.STABLE_DIFFUSION_V1_6,
+        text_prompts=[TextPrompt(text="a big goat", weight=0.5)],
+        in_memory=True,
+        priority=Priority.BATCH
+    )
+
+    assert observed == [(0, 0)]
+    assert result.content == b'png'
+
+def test_client_routes_posts_and_balance_refresh(monkeypatch):
+    import datetime
+    import requests
+    from stability_ai.client import Client
+    from stability_ai.key_pool import Credential
+
+    seen = []
+
+    class FakeResponse:
+        headers = {}
+        elapsed = datetime.timedelta(seconds=0.25)
+
+        def __init__(self, status_code, body=None):
+            self.status_code = status_code
+            self.body = body or {}
+
+        def json(self):
+            return self.body
+
+        def close(self):
+            pass
+
+    def fake_request(method, url, headers=None, **kwargs):
+        seen.append((method, url, headers['Authorization'], headers.get('Stability-Client-ID')))
+        if '/v1/user/' in url:
+            return FakeResponse(200, {'credits': 5.0})
+        return FakeResponse(503)
+
+    monkeypatch.setattr(requests, 'request', fake_request)
+
+    client = Client(
+        credentials=[Credential(api_key='key', rate_limit=1)],
+        client_id='sdk-test',
+        base_urls=['https://a.example', 'https://b.example']
+    )
+
+    response = client.request('POST', 'https://api.stability.ai/v1/generation/engine/text-to-image')
+    assert response.status_code == 503
+    assert [url for _, url, _, _ in seen] == ['https://a.example/v1/generation/engine/text-to-image']
+    assert client.router.states[0].latency == 0.25
+
+    seen.clear()
+    client.refresh_balances()
+    assert len(seen) == 1
+    method, url, authorization, client_id = seen[0]
+    assert (method, authorization, client_id) == ('GET', 'Bearer key', 'sdk-test')
+    assert url.startswith('https://b.example/v1/user/')
+    assert client.key_pool.states[0].credits == 5.0
+
+def test_post_fails_over_only_when_never_sent():
+    import requests
+    from urllib3.exceptions import MaxRetryError, NewConnectionError, ReadTimeoutError
+    from stability_ai.routing import is_connect_error
+
+    refused = requests.exceptions.ConnectionError(MaxRetryError(None, '/', reason=NewConnectionError(None, 'refused')))
+    read_timeout = requests.exceptions.ConnectionError(MaxRetryError(None, '/', reason=ReadTimeoutError(None, '/', 'timed out')))
+
+    assert is_connect_error(refused)
+    assert is_connect_error(requests.exceptions.ConnectTimeout())
+    assert not is_connect_error(read_timeout)
+    assert not is_connect_error(requests.exceptions.ReadTimeout())
+
+def test_router_retries_demoted_endpoint_after_errors_decay(monkeypatch):
+    from stability_ai import routing
+
+    now = [1000.0]
+    monkeypatch.setattr(routing.time, 'monotonic', lambda: now[0])
+
+    router = routing.EndpointRouter(base_urls=['https://a.example.com', 'https://b.example.com'])
+    a, b = router.states
+    router.record(a, latency=0.1, failed=False)
+    router.record(b, latency=0.5, failed=False)
+    router.record(a, latency=None, failed=True)
+
+    assert router.select() is b
+
+    now[0] += 10 * router.error_half_life
+    assert router.select() is a
+
+def test_dropped_stream_is_recorded_as_one_endpoint_failure(monkeypatch):
+    import datetime
+    import requests
+    from stability_ai.client import Client
+
+    class DroppedResponse(FakeStreamResponse):
+        status_code = 200
+        elapsed = datetime.timedelta(seconds=0.1)
+
+        def iter_content(self, chunk_size=1):
+            raise requests.exceptions.ConnectionError('Connection reset by peer')
+
+    monkeypatch.setattr(requests, 'request', lambda method, url, **kwargs: DroppedResponse([]))
+
+    client = Client(api_key='key', base_urls=['https://a.example.com'])
+    records = []
+    record = client.router.record
+    monkeypatch.setattr(client.router, 'record', lambda state, latency, failed: records.append(failed) or record(state, latency, failed))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.request('POST', 'https://api.stability.ai/v1/generation', handler=lambda response: list(response.iter_content()))
+
+    assert records == [True]
+    assert client.router.states[0].consecutive_failures == 1